@@ -11,14 +11,22 @@ Usage:
 """
 from __future__ import annotations
 import argparse
+import asyncio
+import hashlib
+import json
 import logging
-import random
-import string
-import threading
+import logging.handlers
+import mmap
+import os
+import stat
 import queue
 import time
+import traceback
+from dataclasses import dataclass, field
+from functools import cached_property
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import numpy as np
 try:
     from colorama import init as colorama_init, Fore, Style
     colorama_init(autoreset=True)
@@ -28,6 +36,15 @@ except Exception:
         RED = GREEN = YELLOW = CYAN = MAGENTA = BLUE = WHITE = RESET = ''
     Fore = _F()
     Style = _F()
+try:
+    import bls_kernel  # optional Cython kernel, see bls_kernel.pyx
+except ImportError:
+    bls_kernel = None
+try:
+    from numba import njit, prange
+except Exception:
+    # Fallback if numba not installed: hit detection uses plain NumPy instead
+    njit = None
 
 # ---------------------------
 # Configuration
@@ -36,23 +53,58 @@ APP_NAME = "BLS Algeria Booking Simulator"
 LOG_FILE = "bls_algeria_simulator.log"
 OUTPUT_FILE = "bls_generated_list.txt"
 VALID_OUTPUT_FILE = "bls_valid_hits.txt"
+# Records the (seed, count, start_year, record format) and SHA-256 of a seeded OUTPUT_FILE so it can be reused.
+OUTPUT_KEY_FILE = OUTPUT_FILE + ".key"
 
 # If set to True, the program will attempt to call `real_book_request` when 'attempt_real' is used.
 # THIS IS A SAFETY SWITCH: set False by default. If you turn True, you must implement real_book_request
 # to use only legal, documented APIs and supply legal credentials.
 REAL_INTEGRATION_ENABLED = False
 
+# Animate progress bars with artificial delays (demo mode). Set by --animate.
+ANIMATE = False
+
+# Simulated balances a generated record can carry.
+BALANCE_CHOICES = np.array([0, 10, 25, 69, 120, 180, 280])
+
+# Generated lines are fixed width: "<16 digits>|MM/YYYY|<3 digits>|$<4 digits>\n".
+RECORD_WIDTH = 35
+
 # ---------------------------
 # Logging setup
 # ---------------------------
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler()
-    ],
-)
+def setup_logging() -> Tuple[logging.handlers.QueueListener, logging.Handler, logging.Handler]:
+    """
+    Send all log records through a queue: callers only enqueue, and one background
+    listener thread does the file and console writes. INFO records reach the log
+    file in batches; WARNING and above flush the batch immediately.
+    Returns (listener, queue_handler, file_handler) for shutdown_logging.
+    """
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+    file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
+    file_handler.setFormatter(formatter)
+    buffered_file = logging.handlers.MemoryHandler(1024, flushLevel=logging.WARNING, target=file_handler)
+    console = logging.StreamHandler()
+    console.setFormatter(formatter)
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    root.addHandler(queue_handler)
+    listener = logging.handlers.QueueListener(log_queue, buffered_file, console)
+    listener.start()
+    return listener, queue_handler, file_handler
+
+def shutdown_logging(listener: logging.handlers.QueueListener, queue_handler: logging.Handler,
+                     file_handler: logging.Handler):
+    """Detach from the root logger, drain the queue and flush batched records to the log file."""
+    logging.getLogger().removeHandler(queue_handler)
+    queue_handler.close()
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    # MemoryHandler.close() flushes to its target but leaves the target open
+    file_handler.close()
 
 # ---------------------------
 # Utilities
@@ -70,20 +122,54 @@ def banner():
     """
     print(Fore.CYAN + b + Style.RESET_ALL)
 
-def random_string(n=16):
-    return ''.join(random.choices(string.digits, k=n))
+def random_digits(rng: np.random.Generator, n: int, k: int) -> np.ndarray:
+    """Return an (n, k) uint8 matrix of random ASCII digits generated in one batch."""
+    return rng.integers(0, 10, size=(n, k), dtype=np.uint8) + np.uint8(ord('0'))
+
+def digits_to_strings(digits: np.ndarray) -> np.ndarray:
+    # Each contiguous row of k ASCII bytes is reinterpreted as one fixed-width string.
+    return np.ascontiguousarray(digits).view(f"S{digits.shape[1]}").ravel().astype(str)
 
-def random_expiry(start_year=2025, years=6):
-    year = random.randint(start_year, start_year + years - 1)
-    month = random.randint(1, 12)
-    return f"{month:02d}/{year}"
+def random_digit_strings(rng: np.random.Generator, n: int, k: int) -> np.ndarray:
+    """Return an array of n random k-digit strings generated in one batch."""
+    return digits_to_strings(random_digits(rng, n, k))
+
+def random_expiries(rng: np.random.Generator, n: int, start_year=2025, years=6) -> np.ndarray:
+    months = rng.integers(1, 13, size=n)
+    yrs = rng.integers(start_year, start_year + years, size=n)
+    return np.char.add(np.char.add(np.char.mod("%02d", months), "/"), yrs.astype(str))
+
+def write_lines(path: str, lines: List[str], mode='w') -> str:
+    """
+    Write all lines to path with a single write() call and return the written text.
+    With no lines, appending is skipped, but mode 'w' still truncates the file.
+    """
+    text = "\n".join(lines) + "\n" if lines else ""
+    if not text and 'a' in mode:
+        return text
+    with open(path, mode, encoding='utf-8') as f:
+        f.write(text)
+    return text
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def draw_bar(prefix: str, done: float):
+    bar = '=' * int(done * 30) + '.' * (30 - int(done * 30))
+    percent = int(done * 100)
+    print(f"\r{Fore.YELLOW}{prefix} [{bar}] {percent}%{Style.RESET_ALL}", end='', flush=True)
 
 def progress_bar(prefix: str, duration=1.0, steps=30):
+    """
+    Purely cosmetic progress bar. It only animates (and sleeps) when ANIMATE
+    is set via --animate; otherwise it is drawn once, already complete.
+    """
+    if not ANIMATE:
+        draw_bar(prefix, 1.0)
+        print()
+        return
     for i in range(steps + 1):
-        done = i / steps
-        bar = '=' * int(done * 30) + '.' * (30 - int(done * 30))
-        percent = int(done * 100)
-        print(f"\r{Fore.YELLOW}{prefix} [{bar}] {percent}%{Style.RESET_ALL}", end='', flush=True)
+        draw_bar(prefix, i / steps)
         time.sleep(duration / steps)
     print()
 
@@ -91,6 +177,8 @@ def progress_bar(prefix: str, duration=1.0, steps=30):
 # Core Simulation Components
 # ---------------------------
 class BLSRecord:
+    __slots__ = ("code", "expiry", "ref", "balance", "generated_at")
+
     def __init__(self, code: str, expiry: str, ref: str, balance: int):
         self.code = code
         self.expiry = expiry
@@ -99,79 +187,373 @@ class BLSRecord:
         self.generated_at = datetime.utcnow()
 
     def __str__(self):
-        return f"{self.code}|{self.expiry}|{self.ref}|${self.balance}"
+        return f"{self.code}|{self.expiry}|{self.ref}|${self.balance:04d}"
 
-def generate_blscodes(count=100, start_year=2025) -> List[BLSRecord]:
+@dataclass
+class BLSBatch:
+    """
+    Structure-of-arrays storage for many records: one array per field.
+    `rnds` holds each record's check value and is derived from `codes` when omitted.
+    """
+    codes: np.ndarray
+    expiries: np.ndarray
+    refs: np.ndarray
+    balances: np.ndarray
+    rnds: Optional[np.ndarray] = None
+    generated_at: datetime = field(default_factory=datetime.utcnow)
+
+    def __post_init__(self):
+        if self.rnds is None:
+            self.rnds = code_rnds(self.code_points())
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def from_records(cls, records: List[BLSRecord]) -> "BLSBatch":
+        return cls(
+            codes=np.array([r.code for r in records], dtype=str),
+            expiries=np.array([r.expiry for r in records], dtype=str),
+            refs=np.array([r.ref for r in records], dtype=str),
+            balances=np.array([r.balance for r in records], dtype=np.int64),
+        )
+
+    def code_points(self) -> np.ndarray:
+        """Return codes as an (n, width) uint32 matrix of Unicode code points (zero-padded)."""
+        codes = np.ascontiguousarray(self.codes, dtype=str)
+        return codes.view(np.uint32).reshape(len(codes), codes.dtype.itemsize // 4)
+
+    def codes_are_ascii(self) -> bool:
+        return bool(self.code_points().max(initial=0) < 128)
+
+    def code_digits(self) -> np.ndarray:
+        """Return ASCII codes as an (n, width) uint8 matrix of bytes (NUL-padded)."""
+        encoded = self.codes.astype(bytes)
+        return encoded.view(np.uint8).reshape(len(encoded), encoded.dtype.itemsize)
+
+    def code_words(self) -> np.ndarray:
+        """Return codes packed as an (n, width/8) uint64 matrix, zero-padded to whole words."""
+        digits = self.code_digits()
+        pad = -digits.shape[1] % 8
+        if pad:
+            digits = np.pad(digits, ((0, 0), (0, pad)))
+        return np.ascontiguousarray(digits).view(np.uint64)
+
+    @cached_property
+    def lines(self) -> np.ndarray:
+        """Every record formatted as "code|expiry|ref|$balance", built once for the whole batch."""
+        lines = self.codes
+        # np.char.zfill fails on empty input under NumPy 2.x
+        balances = np.char.zfill(self.balances.astype(str), 4) if len(self.balances) else self.balances.astype(str)
+        for sep, col in (("|", self.expiries), ("|", self.refs), ("|$", balances)):
+            lines = np.char.add(np.char.add(lines, sep), col)
+        return lines
+
+    def line(self, i: int) -> str:
+        return str(self.lines[i])
+
+    def hit_lines(self, indices: np.ndarray) -> List[str]:
+        return np.char.add("HIT: ", self.lines[indices]).tolist()
+
+    def record(self, i: int) -> BLSRecord:
+        return BLSRecord(str(self.codes[i]), str(self.expiries[i]), str(self.refs[i]), int(self.balances[i]))
+
+def load_cached_blscodes(key: Dict) -> Optional[BLSBatch]:
+    """Return the records in OUTPUT_FILE if they were generated for `key` and are unmodified."""
+    try:
+        with open(OUTPUT_KEY_FILE, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except (FileNotFoundError, ValueError):
+        return None
+    if saved.get("key") != key or saved.get("sha256") != fingerprint(text):
+        return None
+    return load_blsbatch(OUTPUT_FILE)
+
+def generate_blscodes(count=100, start_year=2025, rng: Optional[np.random.Generator] = None,
+                      seed: Optional[int] = None) -> BLSBatch:
+    """
+    Generate `count` fake records and save them to OUTPUT_FILE.
+    Draw from either an existing `rng` or a new Generator built from `seed`; only
+    seeded output is cached, so an identical earlier run's file can be reused.
+    """
+    if rng is not None and seed is not None:
+        raise ValueError("Pass either rng or seed to generate_blscodes, not both.")
+    # record_width ties the cache to the line format, so files from an older format are regenerated
+    key = {"seed": seed, "count": count, "start_year": start_year, "record_width": RECORD_WIDTH}
+    if seed is not None:
+        cached = load_cached_blscodes(key)
+        if cached is not None:
+            logging.info("Reusing records in %s generated for %s", OUTPUT_FILE, key)
+            return cached
     logging.info("Generating %d fake BLS records (simulation)", count)
-    results = []
-    for _ in range(count):
-        code = random_string(16)
-        expiry = random_expiry(start_year=start_year, years=6)
-        ref = random_string(3)
-        balance = random.choice([0, 10, 25, 69, 120, 180, 280])
-        rec = BLSRecord(code=code, expiry=expiry, ref=ref, balance=balance)
-        results.append(rec)
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        for r in results:
-            f.write(str(r) + "\n")
-    logging.info("Saved generated records to %s", OUTPUT_FILE)
-    return results
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    code_digits = random_digits(rng, count, 16)
+    batch = BLSBatch(
+        codes=digits_to_strings(code_digits),
+        expiries=random_expiries(rng, count, start_year=start_year, years=6),
+        refs=random_digit_strings(rng, count, 3),
+        balances=rng.choice(BALANCE_CHOICES, size=count),
+        rnds=code_rnds(code_digits),
+    )
+    digest = fingerprint(write_lines(OUTPUT_FILE, batch.lines.tolist()))
+    logging.info("Saved generated records to %s (sha256 %s)", OUTPUT_FILE, digest)
+    if seed is not None:
+        with open(OUTPUT_KEY_FILE, 'w', encoding='utf-8') as f:
+            json.dump({"key": key, "sha256": digest}, f)
+    return batch
+
+# Widest field gather_fields copies with one (n, width) index matrix; wider
+# fields are sliced per line so one long line can't blow up memory for the batch.
+GATHER_MAX_WIDTH = 64
+
+# Bytes str.strip() treats as whitespace within ASCII (line feeds never occur inside a line).
+_STRIP_BYTES = np.array([9, 11, 12, 13, 28, 29, 30, 31, 32], dtype=np.uint8)
+
+def gather_fields(data: np.ndarray, starts: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """Copy the byte ranges data[starts[i]:stops[i]] into one NUL-padded bytes array."""
+    lengths = stops - starts
+    width = max(int(lengths.max(initial=0)), 1)
+    if width > GATHER_MAX_WIDTH:
+        raw = data.tobytes()
+        return np.array([raw[a:b] for a, b in zip(starts.tolist(), stops.tolist())], dtype=f"S{width}")
+    offsets = np.arange(width)
+    idx = starts[:, None] + offsets
+    chars = np.where(offsets < lengths[:, None], data[np.minimum(idx, len(data) - 1)], 0).astype(np.uint8)
+    return chars.view(f"S{width}").ravel()
+
+def skip_to(positions: np.ndarray, starts: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """For each range, the first of `positions` at or after starts[i], capped at stops[i]."""
+    i = np.searchsorted(positions, starts)
+    found = positions[np.minimum(i, len(positions) - 1)] if len(positions) else stops
+    return np.where(i < len(positions), np.minimum(found, stops), stops)
+
+def split_records(data: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Split raw UTF-8 "code|expiry|ref|$balance" lines into field arrays without a
+    per-line loop. Like reading the file in text mode and calling
+    line.strip().split('|'), lines end at '\n', '\r\n' or a lone '\r', surrounding
+    whitespace is removed from each line and leading '$' signs from the balance.
+    Lines with fewer than four fields are skipped.
+    """
+    # Universal newlines: a '\r' not followed by '\n' also ends a line ('\r\n' breaks at
+    # the '\n', and the '\r' is stripped below as trailing whitespace)
+    lone_cr = data == ord('\r')
+    lone_cr[:-1] &= data[1:] != ord('\n')
+    ends = np.flatnonzero((data == ord('\n')) | lone_cr)
+    if len(data) and not (data[-1] == ord('\n') or lone_cr[-1]):
+        ends = np.append(ends, len(data))
+    starts = np.concatenate(([0], ends[:-1] + 1)).astype(np.int64)
+    # Strip each line: move starts to the first non-whitespace byte, ends past the last one
+    solid = np.flatnonzero(~np.isin(data, _STRIP_BYTES) & (data != ord('\n')))
+    starts = skip_to(solid, starts, ends)
+    if len(solid):
+        last = np.searchsorted(solid, ends) - 1
+        ends = np.where(last >= 0, np.maximum(solid[np.maximum(last, 0)] + 1, starts), starts)
+    else:
+        ends = starts
+    pipes = np.flatnonzero(data == ord('|'))
+    first = np.searchsorted(pipes, starts)
+    n_pipes = np.searchsorted(pipes, ends) - first
+    keep = n_pipes >= 3
+    starts, ends, first, n_pipes = starts[keep], ends[keep], first[keep], n_pipes[keep]
+    p1, p2, p3 = pipes[first], pipes[first + 1], pipes[first + 2]
+    # Anything after a fourth '|' is ignored, like the extra fields of a str.split
+    bal_end = np.where(n_pipes > 3, pipes[np.minimum(first + 3, len(pipes) - 1)], ends)
+    bal_start = skip_to(np.flatnonzero(data != ord('$')), p3 + 1, bal_end)
+    return {
+        # lstrip also drops leading non-ASCII whitespace, which str.strip() would remove
+        "codes": np.char.lstrip(np.char.decode(gather_fields(data, starts, p1), 'utf-8')),
+        "expiries": np.char.decode(gather_fields(data, p1 + 1, p2), 'utf-8'),
+        "refs": np.char.decode(gather_fields(data, p2 + 1, p3), 'utf-8'),
+        "balances": np.char.decode(gather_fields(data, bal_start, bal_end), 'utf-8').astype(np.int64),
+    }
+
+# Columns of a fixed-width line that hold digits: code, expiry month and year, ref, balance.
+_FIXED_DIGIT_COLUMNS = np.r_[0:16, 17:19, 20:24, 25:28, 30:34]
+
+def split_fixed_records(data: np.ndarray) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Fast path for files made of fixed-width generated lines: view the bytes as an
+    (n, RECORD_WIDTH) matrix and slice fields at known offsets. Returns None when
+    the data is not in that layout.
+    """
+    if len(data) % RECORD_WIDTH:
+        return None
+    rows = data.reshape(-1, RECORD_WIDTH)
+    # Every byte must be where the generator puts it; anything else (whitespace,
+    # extra separators, non-digits) is left to split_records
+    if not ((rows[:, _FIXED_DIGIT_COLUMNS] - np.uint8(ord('0')) < 10).all()
+            and (rows[:, [16, 24, 28]] == ord('|')).all() and (rows[:, 19] == ord('/')).all()
+            and (rows[:, 29] == ord('$')).all() and (rows[:, 34] == ord('\n')).all()):
+        return None
+
+    def column(start: int, stop: int) -> np.ndarray:
+        return np.ascontiguousarray(rows[:, start:stop]).view(f"S{stop - start}").ravel()
+
+    return {
+        "codes": column(0, 16).astype(str),
+        "expiries": column(17, 24).astype(str),
+        "refs": column(25, 28).astype(str),
+        "balances": column(30, 34).astype(np.int64),
+    }
+
+def parse_records(data: np.ndarray) -> Dict[str, np.ndarray]:
+    fields = split_fixed_records(data)
+    if fields is None:
+        fields = split_records(data)
+    return fields
+
+def load_blsbatch(path: str) -> BLSBatch:
+    """
+    Parse a generated records file into a BLSBatch.
+    Regular files are memory-mapped and split with array operations, so no per-line
+    Python strings are created; pipes and other streams are read whole first.
+    Lines with fewer than four '|' separated fields are skipped.
+    """
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if not stat.S_ISREG(st.st_mode):
+            return BLSBatch(**parse_records(np.frombuffer(f.read(), dtype=np.uint8)))
+        if st.st_size == 0:
+            return BLSBatch.from_records([])
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = np.frombuffer(mm, dtype=np.uint8)
+            try:
+                fields = parse_records(data)
+            except Exception as exc:
+                # The parser frames in the traceback still hold views of the mmap
+                traceback.clear_frames(exc.__traceback__)
+                raise
+            finally:
+                # release the buffer before the mmap is closed, even if parsing failed
+                del data
+    return BLSBatch(**fields)
 
 # ---------------------------
 # Simulation of checking/booking
 # ---------------------------
-def simulate_check(record: BLSRecord, delay=0.25) -> Optional[str]:
+def code_rnds(code_digits: np.ndarray) -> np.ndarray:
     """
-    Simulate checking a BLS record.
-    Returns a success string if "valid" (simulated), else None.
+    Per-record check value from an (n, k) matrix of code characters (ASCII bytes or
+    code points): the deterministic-ish random is the sum of the code's character ordinals.
     """
-    # deterministic-ish random based on code
-    seed = sum(ord(c) for c in record.code)
-    rnd = (seed % 100) / 100.0
-    time.sleep(delay * (0.5 + rnd))  # variable delay
+    seeds = code_digits.sum(axis=1, dtype=np.uint32)
+    return (seeds % 100) / 100.0
+
+def hit_mask(rnds: np.ndarray, balances: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Vectorized check_result criteria: True where a record is a hit."""
+    out = np.greater(rnds, 0.85, out=out)
+    return np.logical_or(out, balances >= 120, out=out)
+
+# Hit-mask storage reused across multi_thread_check calls instead of allocating
+# a new mask each time; dropped back to the requested size once it grows past the cap.
+_HITS_MASK = np.empty(0, dtype=np.bool_)
+_HITS_MASK_MAX = 128 * 1024
+
+def hits_mask_buffer(n: int) -> np.ndarray:
+    """Return a length-n view of the shared hit-mask buffer (contents undefined)."""
+    global _HITS_MASK
+    if n > len(_HITS_MASK) or len(_HITS_MASK) > _HITS_MASK_MAX >= n:
+        _HITS_MASK = np.empty(n, dtype=np.bool_)
+    return _HITS_MASK[:n]
+
+# SWAR constants: low nibble of every byte, and the byte-wise "sum into top byte" multiplier.
+_NIBBLES = np.uint64(0x0F0F0F0F0F0F0F0F)
+_BYTE_ONES = np.uint64(0x0101010101010101)
+_FOUR = np.uint64(4)
+_TOP_BYTE = np.uint64(56)
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _check_batch_numba(code_words, balances, hits):
+        n = code_words.shape[0]
+        for i in prange(n):
+            s = np.uint64(0)
+            for j in range(code_words.shape[1]):
+                x = code_words[i, j]
+                # Sum the 8 bytes of x without unpacking: split each byte into nibbles so
+                # every horizontal sum fits in one byte, then fold each with one multiply.
+                lo = ((x & _NIBBLES) * _BYTE_ONES) >> _TOP_BYTE
+                hi = (((x >> _FOUR) & _NIBBLES) * _BYTE_ONES) >> _TOP_BYTE
+                s += (hi << _FOUR) + lo
+            hits[i] = (np.int64(s) % 100 > 85) | (balances[i] >= 120)
+
+def check_hits(batch: BLSBatch, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Hit mask for a whole batch, written into `out` (a bool array) when given.
+    Uses the Cython kernel if it has been built, else the numba kernel if numba
+    is installed, else plain NumPy. The compiled kernels work on ASCII bytes, so
+    batches with non-ASCII codes always take the NumPy path.
+    """
+    if out is None:
+        out = np.empty(len(batch), dtype=np.bool_)
+    compiled = (bls_kernel is not None or njit is not None) and batch.codes_are_ascii()
+    if not compiled:
+        hit_mask(batch.rnds, batch.balances, out=out)
+    elif bls_kernel is not None:
+        bls_kernel.check(batch.code_digits(), np.ascontiguousarray(batch.balances, dtype=np.int64), out.view(np.uint8))
+    else:
+        _check_batch_numba(batch.code_words(), batch.balances, out)
+    return out
+
+def check_result(batch: BLSBatch, i: int) -> Optional[str]:
     # criteria for 'hit' purely simulated:
-    if rnd > 0.85 or record.balance >= 120:
-        return f"HIT: {record.code}|{record.expiry}|{record.ref}|${record.balance}"
+    if batch.rnds[i] > 0.85 or batch.balances[i] >= 120:
+        return f"HIT: {batch.line(i)}"
     return None
 
-def worker_check(q: "queue.Queue[BLSRecord]", out_q: "queue.Queue[str]", thread_id: int):
-    while True:
-        try:
-            record = q.get_nowait()
-        except queue.Empty:
-            return
-        logging.debug("Thread %d checking %s", thread_id, record.code)
-        result = simulate_check(record)
-        if result:
-            logging.info("Thread %d found valid: %s", thread_id, result)
-            out_q.put(result)
-        q.task_done()
-
-def multi_thread_check(records: List[BLSRecord], threads=8):
-    q: "queue.Queue[BLSRecord]" = queue.Queue()
-    out_q: "queue.Queue[str]" = queue.Queue()
-    for r in records:
-        q.put(r)
-    workers = []
-    for i in range(min(threads, len(records))):
-        t = threading.Thread(target=worker_check, args=(q, out_q, i+1), daemon=True)
-        t.start()
-        workers.append(t)
-    q.join()
+async def simulate_check_async(batch: BLSBatch, i: int, limit: asyncio.Semaphore, delay=0.25) -> Optional[str]:
+    """
+    Simulate checking record i of a batch; at most `limit` checks wait concurrently.
+    Returns a success string if "valid" (simulated), else None.
+    """
+    async with limit:
+        await asyncio.sleep(delay * (0.5 + batch.rnds[i]))  # variable delay
+    return check_result(batch, i)
+
+async def run_all_checks(batch: BLSBatch, concurrency: int, delay=0.25,
+                         indices: Optional[List[int]] = None) -> List[Optional[str]]:
+    """Check the records at `indices` (default: all), returning results in the same order."""
+    if indices is None:
+        indices = range(len(batch))
+    limit = asyncio.Semaphore(max(1, concurrency))
+    return await asyncio.gather(*(simulate_check_async(batch, i, limit, delay) for i in indices))
+
+def multi_thread_check(batch: BLSBatch, threads=8, delay=0.25):
+    """
+    Check all records concurrently on a single event loop.
+    `threads` caps how many simulated checks are in flight at once.
+    With delay <= 0 nothing is waited on, so hits are computed as one array mask.
+    """
     found = []
-    while not out_q.empty():
-        found.append(out_q.get())
-    if found:
-        with open(VALID_OUTPUT_FILE, 'a', encoding='utf-8') as vf:
-            for line in found:
-                vf.write(line + "\n")
-    logging.info("Multi-thread check complete: %d valid found", len(found))
+    mask = hits_mask_buffer(len(batch))
+    if delay <= 0:
+        results = batch.hit_lines(np.flatnonzero(check_hits(batch, out=mask)))
+    else:
+        # A balance >= 120 is a hit whatever the check says, so only the rest are checked.
+        auto_idx = np.flatnonzero(np.greater_equal(batch.balances, 120, out=mask))
+        results = [None] * len(batch)
+        for i, result in zip(auto_idx.tolist(), batch.hit_lines(auto_idx)):
+            results[i] = result
+        contested = np.flatnonzero(np.logical_not(mask, out=mask)).tolist()
+        for i, result in zip(contested, asyncio.run(run_all_checks(batch, threads, delay, contested))):
+            results[i] = result
+    for result in results:
+        if result:
+            logging.info("Found valid: %s", result)
+            found.append(result)
+    write_lines(VALID_OUTPUT_FILE, found, mode='a')
+    logging.info("Concurrent check complete: %d valid found", len(found))
     return found
 
 # ---------------------------
 # Safe Integration Placeholder
 # ---------------------------
-def real_book_request_simulation_placeholder(record: BLSRecord, user_data: Dict) -> Dict:
+def real_book_request_simulation_placeholder(record: BLSRecord, user_data: Dict,
+                                             rng: Optional[np.random.Generator] = None) -> Dict:
     """
     This function is a SAFE SIMULATION placeholder for where real booking code would go.
     DO NOT replace this with code that attempts to bypass protections or scrape private endpoints.
@@ -186,12 +568,14 @@ def real_book_request_simulation_placeholder(record: BLSRecord, user_data: Dict)
     # Simulate network/API latency
     progress_bar(f"Contacting (simulated) booking endpoint for {record.code}", duration=0.8)
     # Produce a simulated response
-    ok = random.random() > 0.78 or record.balance >= 120
+    if rng is None:
+        rng = np.random.default_rng()
+    ok = rng.random() > 0.78 or record.balance >= 120
     if ok:
         return {
             "status": "success",
             "message": "Simulated booking confirmed",
-            "appointment_id": f"SIM-{random_string(8)}",
+            "appointment_id": f"SIM-{random_digit_strings(rng, 1, 8)[0]}",
             "record": str(record)
         }
     else:
@@ -227,23 +611,16 @@ def real_book_request(record: BLSRecord, user_data: Dict) -> Dict:
 # ---------------------------
 def handle_generate(args):
     count = max(1, args.count)
-    recs = generate_blscodes(count=count, start_year=args.start_year)
+    recs = generate_blscodes(count=count, start_year=args.start_year, seed=args.seed)
     print(Fore.GREEN + f"Generated {len(recs)} records and saved to {OUTPUT_FILE}" + Style.RESET_ALL)
 
 def handle_simulate_check(args):
     # read from OUTPUT_FILE by default
     try:
-        with open(args.input or OUTPUT_FILE, 'r', encoding='utf-8') as f:
-            lines = [line.strip() for line in f if line.strip()]
-        records = []
-        for ln in lines:
-            parts = ln.split('|')
-            if len(parts) >= 4:
-                code, expiry, ref, bal = parts[0], parts[1], parts[2], parts[3].lstrip('$')
-                records.append(BLSRecord(code, expiry, ref, int(bal)))
-        print(Fore.CYAN + f"Loaded {len(records)} records from {args.input or OUTPUT_FILE}" + Style.RESET_ALL)
+        batch = load_blsbatch(args.input or OUTPUT_FILE)
+        print(Fore.CYAN + f"Loaded {len(batch)} records from {args.input or OUTPUT_FILE}" + Style.RESET_ALL)
         progress_bar("Preparing multi-thread check", duration=0.6)
-        found = multi_thread_check(records, threads=args.threads)
+        found = multi_thread_check(batch, threads=args.threads, delay=args.delay)
         print(Fore.GREEN + f"Simulation complete. {len(found)} valid(s) found. See {VALID_OUTPUT_FILE}" + Style.RESET_ALL)
     except FileNotFoundError:
         print(Fore.RED + "Input file not found. Generate records first or provide a file path." + Style.RESET_ALL)
@@ -251,17 +628,15 @@ def handle_simulate_check(args):
 def handle_attempt_book(args):
     # This attempts to "book" either via simulation or real integration.
     try:
-        with open(args.input or OUTPUT_FILE, 'r', encoding='utf-8') as f:
-            lines = [line.strip() for line in f if line.strip()]
+        batch = load_blsbatch(args.input or OUTPUT_FILE)
     except FileNotFoundError:
         print(Fore.RED + "Input file not found. Generate records first or provide a file path." + Style.RESET_ALL)
         return
     # For demonstration, we'll attempt N random records
-    sample = random.sample(lines, min(args.attempts, len(lines)))
-    for ln in sample:
-        parts = ln.split('|')
-        code, expiry, ref, bal = parts[0], parts[1], parts[2], parts[3].lstrip('$')
-        record = BLSRecord(code, expiry, ref, int(bal))
+    sample = args.rng.choice(len(batch), size=min(args.attempts, len(batch)), replace=False)
+    booked = []
+    for i in sample:
+        record = batch.record(i)
         print(Fore.MAGENTA + f"\n=== Attempting booking for {record.code} (simulated) ===" + Style.RESET_ALL)
         if REAL_INTEGRATION_ENABLED and args.use_real:
             try:
@@ -270,19 +645,21 @@ def handle_attempt_book(args):
             except Exception as e:
                 print(Fore.RED + f"Real integration failed or disabled: {e}" + Style.RESET_ALL)
         else:
-            resp = real_book_request_simulation_placeholder(record, user_data={})
+            resp = real_book_request_simulation_placeholder(record, user_data={}, rng=args.rng)
             if resp.get("status") == "success":
                 print(Fore.GREEN + f"Simulated booking success: appointment id {resp.get('appointment_id')}" + Style.RESET_ALL)
-                with open(VALID_OUTPUT_FILE, 'a', encoding='utf-8') as vf:
-                    vf.write(f"BOOKED_SIM|{resp.get('appointment_id')}|{record}\n")
+                booked.append(f"BOOKED_SIM|{resp.get('appointment_id')}|{record}")
             else:
                 print(Fore.YELLOW + f"Simulated booking failed: {resp.get('message')}" + Style.RESET_ALL)
+    write_lines(VALID_OUTPUT_FILE, booked, mode='a')
 
 # ---------------------------
 # CLI argument parsing
 # ---------------------------
 def build_parser():
     parser = argparse.ArgumentParser(prog=APP_NAME, description="BLS Algeria Booking Simulator & Safe Integration Template")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the random generator (reproducible runs).")
+    parser.add_argument("--animate", action="store_true", help="Animate progress bars with simulated delays (demo mode).")
     sub = parser.add_subparsers(dest="command", required=True)
 
     gen = sub.add_parser("generate", help="Generate fake BLS records (simulation).")
@@ -290,9 +667,10 @@ def build_parser():
     gen.add_argument("--start-year", type=int, default=2025, help="Start year for expiries.")
     gen.set_defaults(func=handle_generate)
 
-    check = sub.add_parser("simulate-check", help="Simulate checking generated records with multi-threading.")
+    check = sub.add_parser("simulate-check", help="Simulate checking generated records concurrently.")
     check.add_argument("--input", "-i", type=str, default=None, help="Input file to read records from (default: generated file).")
-    check.add_argument("--threads", "-t", type=int, default=8, help="Number of worker threads.")
+    check.add_argument("--threads", "-t", type=int, default=8, help="Maximum number of concurrent checks.")
+    check.add_argument("--delay", type=float, default=0.25, help="Base simulated delay per check in seconds (0 disables waiting).")
     check.set_defaults(func=handle_simulate_check)
 
     book = sub.add_parser("attempt-book", help="Attempt bookings (simulation).")
@@ -307,14 +685,20 @@ def build_parser():
 # Main entry point
 # ---------------------------
 def main():
+    global ANIMATE
     banner()
     parser = build_parser()
     args = parser.parse_args()
+    ANIMATE = args.animate
+    args.rng = np.random.default_rng(args.seed)
+    log_handlers = setup_logging()
     try:
         args.func(args)
     except Exception as exc:
         logging.exception("Unhandled exception: %s", exc)
         print(Fore.RED + "An error occurred. See log file for details." + Style.RESET_ALL)
+    finally:
+        shutdown_logging(*log_handlers)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,21 @@
+# cython: boundscheck=False, wraparound=False, cdivision=True
+"""
+Optional compiled hit-detection kernel for BLS.py.
+
+Build in place with:
+    cythonize -i bls_kernel.pyx
+BLS.py falls back to numba (or plain NumPy) when this module is not built.
+"""
+from libc.stdint cimport int64_t
+
+
+def check(const unsigned char[:, ::1] codes, const int64_t[::1] balances, unsigned char[::1] hits):
+    """Fill hits[i] with 1 where record i is a simulated hit, else 0."""
+    cdef Py_ssize_t n = codes.shape[0], k = codes.shape[1], i, j
+    cdef unsigned int s
+    with nogil:
+        for i in range(n):
+            s = 0
+            for j in range(k):
+                s += codes[i, j]
+            hits[i] = (s % 100) > 85 or balances[i] >= 120
@@ -0,0 +1,199 @@
+import logging
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import BLS
+
+
+def write(tmp_path, text):
+    path = tmp_path / "records.txt"
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def test_load_malformed_balance_raises_parse_error(tmp_path):
+    # The mmap must be released so the real parse error is not masked by a BufferError.
+    with pytest.raises(ValueError):
+        BLS.load_blsbatch(write(tmp_path, "a|b|c|\n"))
+
+
+def test_load_strips_lines_and_dollar_signs(tmp_path):
+    batch = BLS.load_blsbatch(write(tmp_path, "  a|b|c|$5  \r\n\n1|2|3|$$7|x\nbad|line\n"))
+    assert batch.codes.tolist() == ["a", "1"]
+    assert batch.balances.tolist() == [5, 7]
+    assert np.allclose(batch.rnds, [(ord("a") % 100) / 100.0, (ord("1") % 100) / 100.0])
+
+
+def test_load_long_field(tmp_path):
+    long_code = "9" * 500
+    batch = BLS.load_blsbatch(write(tmp_path, f"{long_code}|01/2026|123|$5\n1|2|3|$4\n"))
+    assert batch.codes.tolist() == [long_code, "1"]
+    assert batch.balances.tolist() == [5, 4]
+
+
+def test_load_fixed_width_matches_generated(tmp_path, monkeypatch):
+    monkeypatch.setattr(BLS, "OUTPUT_FILE", str(tmp_path / "generated.txt"))
+    batch = BLS.generate_blscodes(50, rng=np.random.default_rng(1))
+    loaded = BLS.load_blsbatch(BLS.OUTPUT_FILE)
+    assert loaded.lines.tolist() == batch.lines.tolist()
+
+
+def test_check_empty_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(BLS, "VALID_OUTPUT_FILE", str(tmp_path / "hits.txt"))
+    for text in ("", "no|valid\n"):
+        batch = BLS.load_blsbatch(write(tmp_path, text))
+        assert batch.lines.tolist() == []
+        assert BLS.multi_thread_check(batch, delay=0) == []
+        assert BLS.multi_thread_check(batch) == []
+
+
+def test_generate_zero_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(BLS, "OUTPUT_FILE", str(tmp_path / "generated.txt"))
+    batch = BLS.generate_blscodes(0, rng=np.random.default_rng(1))
+    assert len(batch) == 0
+    assert BLS.random_expiries(np.random.default_rng(1), 3).tolist()[0][2] == "/"
+
+
+def baseline_hits(batch):
+    # The original per-record rule from simulate_check
+    return [
+        (sum(ord(c) for c in code) % 100) / 100.0 > 0.85 or balance >= 120
+        for code, balance in zip(batch.codes.tolist(), batch.balances.tolist())
+    ]
+
+
+def available_backends():
+    backends = ["numpy"]
+    if BLS.njit is not None:
+        backends.append("numba")
+    if BLS.bls_kernel is not None:
+        backends.append("cython")
+    return backends
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_check_hits_matches_baseline_rule(backend, tmp_path, monkeypatch):
+    if backend != "cython":
+        monkeypatch.setattr(BLS, "bls_kernel", None)
+    if backend == "numpy":
+        monkeypatch.setattr(BLS, "njit", None)
+    monkeypatch.setattr(BLS, "OUTPUT_FILE", str(tmp_path / "generated.txt"))
+    rng = np.random.default_rng(5)
+    generated = BLS.generate_blscodes(5000, rng=rng)
+    codes = ["", "1", "12345678", "123456789", "~" * 23, "zz\x7f|abc", "9" * 40]
+    codes += ["".join(map(str, rng.integers(0, 10, size=k))) for k in rng.integers(1, 30, size=500)]
+    variable = BLS.BLSBatch(
+        codes=np.array(codes, dtype=str),
+        expiries=np.full(len(codes), "01/2026"),
+        refs=np.full(len(codes), "123"),
+        balances=rng.choice(BLS.BALANCE_CHOICES, size=len(codes)),
+    )
+    for batch in (generated, variable):
+        hits = BLS.check_hits(batch)
+        assert hits.dtype == np.bool_
+        assert hits.tolist() == BLS.hit_mask(batch.rnds, batch.balances).tolist() == baseline_hits(batch)
+
+
+@pytest.fixture
+def output_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(BLS, "OUTPUT_FILE", str(tmp_path / "generated.txt"))
+    monkeypatch.setattr(BLS, "OUTPUT_KEY_FILE", str(tmp_path / "generated.txt.key"))
+    return tmp_path
+
+
+def no_generation(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("records were regenerated")
+    monkeypatch.setattr(BLS, "random_digits", fail)
+
+
+def test_seeded_generate_reuses_output(output_files, monkeypatch):
+    first = BLS.generate_blscodes(20, seed=7)
+    no_generation(monkeypatch)
+    again = BLS.generate_blscodes(20, seed=7)
+    assert again.lines.tolist() == first.lines.tolist()
+
+
+def test_seeded_generate_cache_invalidation(output_files, monkeypatch):
+    first = BLS.generate_blscodes(20, seed=7)
+    assert len(BLS.generate_blscodes(21, seed=7)) == 21
+    assert BLS.generate_blscodes(20, seed=7).lines.tolist() == first.lines.tolist()
+    with open(BLS.OUTPUT_FILE, "a", encoding="utf-8") as f:
+        f.write("1234567890123456|01/2026|123|$0005\n")
+    assert BLS.generate_blscodes(20, seed=7).lines.tolist() == first.lines.tolist()
+    no_generation(monkeypatch)
+    assert BLS.generate_blscodes(20, seed=7).lines.tolist() == first.lines.tolist()
+
+
+def test_generate_with_external_rng_is_not_cached(output_files):
+    BLS.generate_blscodes(5, rng=np.random.default_rng(7))
+    assert not (output_files / "generated.txt.key").exists()
+    with pytest.raises(ValueError):
+        BLS.generate_blscodes(5, rng=np.random.default_rng(7), seed=7)
+
+
+def test_logging_setup_and_shutdown(tmp_path, monkeypatch):
+    monkeypatch.setattr(BLS, "LOG_FILE", str(tmp_path / "sim.log"))
+    root = logging.getLogger()
+    before = list(root.handlers)
+    for _ in range(2):
+        listener, queue_handler, file_handler = BLS.setup_logging()
+        assert queue_handler in root.handlers
+        logging.info("batched record")
+        BLS.shutdown_logging(listener, queue_handler, file_handler)
+        assert root.handlers == before
+        assert file_handler.stream is None
+    assert (tmp_path / "sim.log").read_text(encoding="utf-8").count("batched record") == 2
+
+
+def test_load_utf8_fields(tmp_path):
+    batch = BLS.load_blsbatch(write(tmp_path, "é|b|ç|$5\n x|y|z|$6 \n"))
+    assert batch.codes.tolist() == ["é", "x"]
+    assert batch.refs.tolist() == ["ç", "z"]
+    assert batch.balances.tolist() == [5, 6]
+    assert np.allclose(batch.rnds, [(ord("é") % 100) / 100.0, (ord("x") % 100) / 100.0])
+    assert BLS.check_hits(batch).tolist() == baseline_hits(batch)
+
+
+def test_load_lone_carriage_return_ends_line(tmp_path):
+    batch = BLS.load_blsbatch(write(tmp_path, "a\rb|c|d|5\r1|2|3|$4\r\n7|8|9|$1\r"))
+    assert batch.codes.tolist() == ["b", "1", "7"]
+    assert batch.balances.tolist() == [5, 4, 1]
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs named pipes")
+def test_load_from_pipe(tmp_path, monkeypatch):
+    monkeypatch.setattr(BLS, "OUTPUT_FILE", str(tmp_path / "generated.txt"))
+    batch = BLS.generate_blscodes(10, rng=np.random.default_rng(2))
+    fifo = str(tmp_path / "fifo")
+    os.mkfifo(fifo)
+
+    def feed():
+        with open(fifo, "wb") as out, open(BLS.OUTPUT_FILE, "rb") as src:
+            out.write(src.read())
+
+    writer = threading.Thread(target=feed)
+    writer.start()
+    loaded = BLS.load_blsbatch(fifo)
+    writer.join()
+    assert loaded.lines.tolist() == batch.lines.tolist()
+
+
+@pytest.mark.parametrize("line", [
+    " 123456789012345|01/2026|123|$0005\n",
+    "1234567|89012345|01/2026|123|$0005\n",
+    "123456789012345a|01/2026|123|$0005\n",
+    "1234567890123456|01-2026|123|$0005\n",
+    "1234567890123456|01/2026|12 |$0005\n",
+])
+def test_fixed_width_fast_path_only_for_generated_layout(tmp_path, line):
+    assert len(line) == BLS.RECORD_WIDTH
+    data = np.frombuffer(line.encode("utf-8"), dtype=np.uint8)
+    assert BLS.split_fixed_records(data) is None
+    loaded = BLS.load_blsbatch(write(tmp_path, line))
+    expected = BLS.split_records(data)
+    assert loaded.codes.tolist() == expected["codes"].tolist()
+    assert loaded.balances.tolist() == expected["balances"].tolist()